@@ -2,15 +2,19 @@
 
 import os
 import io
+import codecs
 import base64
 import re
 import pandas as pd
 import numpy as np
-import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
 
 CSV_PATH = os.environ.get("JOBS_MERGED_CSV", "merged_jobs.csv")
 
+# Business columns shown in the table and exported (CSV download / JSON preview)
+EXPORT_COLS = ["title","company","location","date_posted","is_open","source","years_required","seniority","link"]
+
 # ---------------------- Background ----------------------
 def set_background():
     """
@@ -140,29 +144,90 @@ def normalize_city(raw: str) -> str:
     # לא נמצאה עיר
     return ""
 
+# Bump whenever clean_data's columns or dtypes change, so older snapshots are rebuilt
+CLEAN_SNAPSHOT_VERSION = 1
+
+def parquet_path(csv_path: str) -> str:
+    return f"{os.path.splitext(csv_path)[0]}.v{CLEAN_SNAPSHOT_VERSION}.parquet"
+
+
 @st.cache_data(show_spinner=False)
 def load_data(path: str) -> pd.DataFrame:
-    encodings = ["utf-8-sig", "utf-8", "cp1255"]
-    last_err = None
-    for enc in encodings:
+    """
+    Cleaned dashboard frame for the CSV at `path`.
+    Reuses a Parquet snapshot next to the CSV when it is at least as new as the CSV
+    (the file name carries CLEAN_SNAPSHOT_VERSION, so a clean_data change never loads a stale schema);
+    otherwise runs the full clean-up and (best-effort) refreshes the snapshot.
+    """
+    pq_path = parquet_path(path)
+    df = None
+    if os.path.exists(pq_path) and os.path.getmtime(pq_path) >= os.path.getmtime(path):
         try:
-            df = pd.read_csv(path, encoding=enc)
-            break
-        except Exception as e:
-            last_err = e
-            continue
-    if 'df' not in locals():
-        raise last_err
+            df = pd.read_parquet(pq_path)
+        except Exception:
+            df = None
+    if df is None:
+        df = clean_data(path)
+        try:
+            df.to_parquet(pq_path, compression="zstd", index=False)
+        except Exception:
+            pass  # read-only FS / no parquet engine: the CSV path still works
+
+    # age_days depends on "now", so it is never taken from the snapshot
+    if "date_posted" in df.columns:
+        df["age_days"] = (pd.Timestamp.utcnow() - df["date_posted"]).dt.days
+    else:
+        df["age_days"] = np.nan
+
+    # Date bounds for the sidebar range picker (NaT when there are no dates)
+    posted = df["date_posted"] if "date_posted" in df.columns else pd.Series(pd.NaT, index=df.index)
+    df.attrs["dt_min"] = posted.min()
+    df.attrs["dt_max"] = posted.max()
+
+    return df
+
+
+def sniff_encoding(path: str, sample_size: int = 64 * 1024) -> str:
+    """utf-8-sig if the file starts with a BOM, utf-8 if a leading sample decodes, else cp1255."""
+    with open(path, "rb") as fh:
+        head = fh.read(sample_size)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # incremental decoder tolerates a multi-byte char cut off at the sample edge
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1255"
+
+
+TEXT_COLS = ["title","company","location","source","status","is_open","origin_file"]
+DATE_COLS = ["date_posted","scraped_at","stale_at"]
+
+def clean_data(path: str) -> pd.DataFrame:
+    enc = sniff_encoding(path)
+    header = pd.read_csv(path, encoding=enc, nrows=0).columns
+    # Let the reader produce string/datetime columns directly (no astype/to_datetime copies)
+    df = pd.read_csv(
+        path,
+        encoding=enc,
+        dtype={c: str for c in TEXT_COLS + ["link"]},
+        parse_dates=[c for c in DATE_COLS if c in header],
+        date_format="ISO8601",
+    )
 
     # Normalize common columns
-    for col in ["title","company","location","source","status","is_open","origin_file"]:
+    for col in TEXT_COLS:
         if col in df.columns:
-            df[col] = df[col].fillna("").astype(str).str.strip()
+            df[col] = df[col].str.strip().fillna("")
 
-    # Robust date parsing
-    for col in ["date_posted","scraped_at","stale_at"]:
+    # Dates: reader output is used as-is when tz-aware; anything it left unparsed is coerced
+    for col in DATE_COLS:
         if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors="coerce", utc=True)
+            if isinstance(df[col].dtype, pd.DatetimeTZDtype):
+                df[col] = df[col].dt.tz_convert("UTC")
+            else:
+                df[col] = pd.to_datetime(df[col], errors="coerce", utc=True)
 
     # Boolean-ish normalize
     if "is_open" in df.columns:
@@ -173,113 +238,142 @@ def load_data(path: str) -> pd.DataFrame:
         if need not in df.columns:
             df[need] = ""
 
-    # posted_date (date only) and age_days
-    now = pd.Timestamp.utcnow()
+    # posted_date (date only); age_days is added by load_data
     if "date_posted" in df.columns:
         df["posted_date"] = df["date_posted"].dt.date
-        df["age_days"] = (now - df["date_posted"]).dt.days
     else:
         df["posted_date"] = pd.NaT
-        df["age_days"] = np.nan
 
     # City heuristic (canonical + empty if none)
-    def short_loc(s: str) -> str:
-        if not isinstance(s, str):
-            return ""
-        s = s.replace("•", " ").strip()
-        return s.split(",")[0].strip() if "," in s else s
-
-    df["city_hint"] = df["location"].apply(lambda x: normalize_city(short_loc(x) or str(x)))
+    loc = df["location"].fillna("").astype(str)
+    short = loc.str.replace("•", " ", regex=False).str.split(",", n=1).str[0].str.strip()
+    df["city_hint"] = short.where(short != "", loc).map(normalize_city)
 
     # Canonical link
     if "link_canonical" not in df.columns and "link" in df.columns:
         df["link_canonical"] = df["link"]
 
-    # Search haystack
-    df["role_lc"] = df["title"].fillna("").str.lower()
+    # Search haystack (lowercased once here instead of on every rerun)
+    df["_haystack"] = (
+        df["title"].fillna("")
+        + " || " + df["company"].fillna("")
+        + " || " + text_col(df, "About Us")
+        + " || " + text_col(df, "About the Role")
+        + " || " + text_col(df, "Qualifications")
+    ).str.lower()
 
     # Years of experience (best-effort) from multiple fields
-    df["years_required"] = df.apply(
-        lambda r: extract_years_from_text(
-            " ".join([
-                str(r.get("title","")),
-                str(r.get("Qualifications","")),
-                str(r.get("About the Role","")),
-                str(r.get("About Us",""))
-            ])
-        ),
-        axis=1
+    hay = df["title"].fillna("")
+    for col in ["Qualifications", "About the Role", "About Us"]:
+        hay = hay + " " + text_col(df, col)
+    hits = hay.str.extractall(YEARS_RE)
+    df["years_required"] = (
+        hits.bfill(axis=1).iloc[:, 0].astype(float)
+            .groupby(level=0).min()
+            .reindex(df.index)
     )
 
     # Seniority bucket (title + years)
-    df["seniority"] = df.apply(lambda r: seniority_bucket(r.get("title",""), r.get("years_required")), axis=1)
+    df["seniority"] = seniority_bucket(df["title"], df["years_required"])
+
+    # Low-cardinality labels -> category (cheaper isin/groupby/nunique)
+    for col in ["company","source","city_hint","seniority","status"]:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
 
     return df
 
 
+@st.cache_data(show_spinner=False)
+def filter_options(path: str, col: str) -> list:
+    """Sorted non-empty values of a column, for the sidebar multiselects (cached per CSV)."""
+    df = load_data(path)
+    return sorted(v for v in df[col].dropna().unique() if v)
+
+
+def export_cols(df: pd.DataFrame) -> list:
+    return [c for c in EXPORT_COLS if c in df.columns]
+
+
+def text_col(df: pd.DataFrame, col: str) -> pd.Series:
+    """Column as clean strings ('' when missing), aligned to df.index."""
+    if col not in df.columns:
+        return pd.Series("", index=df.index)
+    return df[col].fillna("").astype(str)
+
+
 def format_count(n):
     try: return f"{int(n):,}".replace(",", "\u2009")
     except: return str(n)
 
 
+@st.cache_data(show_spinner=False, max_entries=64)
+def make_bar(x: tuple, y: tuple, title=None, tickangle=None) -> go.Figure:
+    """Bar figure from already-aggregated values (tuples, so reruns with the same counts hit the cache)."""
+    fig = go.Figure(go.Bar(x=list(x), y=list(y)))
+    fig.update_layout(title=title, margin=dict(l=10,r=10,t=40 if title else 10,b=10))
+    if tickangle is not None:
+        fig.update_layout(xaxis_tickangle=tickangle)
+    return fig
+
+
 def df_to_csv_download(df: pd.DataFrame) -> bytes:
-    buff = io.StringIO()
-    df.to_csv(buff, index=False, encoding="utf-8-sig")
-    return buff.getvalue().encode("utf-8-sig")
+    buff = io.BytesIO()
+    df.to_csv(buff, index=False, encoding="utf-8-sig")  # BOM written by pandas
+    return buff.getvalue()
 
 
-# --------- Years of experience extraction ---------
-EN_YEARS_RE = re.compile(
-    r"""(?:
-            at\ least\ \s*(\d{1,2})\s*\+?\s*years? |
-            (\d{1,2})\s*\+?\s*years? (?:\sof\s(?:relevant|professional)\s+experience)? |
-            (\d{1,2})\s*\+\s*years?
-        )""",
-    re.IGNORECASE | re.VERBOSE
-)
+@st.cache_data(show_spinner=False, max_entries=16)
+def filtered_csv(path: str, rows: tuple) -> bytes:
+    """CSV bytes for the given row labels of load_data(path); keyed on the filter result, not the frame."""
+    df = load_data(path)
+    return df_to_csv_download(df.loc[list(rows), export_cols(df)])
+
 
-HE_YEARS_RE = re.compile(
-    r"""(?:
-            לפחות\s*(\d{1,2})\s*(?:\+)?\s*(?:שנה|שנים|שנות)\s*ניסיון |
-            (\ד{1,2})\s*(?:\+)?\s*(?:שנה|שנים|שנות)\s*ניסיון
-        )""",
+# --------- Years of experience extraction ---------
+EN_YEARS_SRC = r"""
+    at\ least\ \s*(?P<en1>\d{1,2})\s*\+?\s*years? |
+    (?P<en2>\d{1,2})\s*\+?\s*years? (?:\sof\s(?:relevant|professional)\s+experience)? |
+    (?P<en3>\d{1,2})\s*\+\s*years?
+"""
+
+HE_YEARS_SRC = r"""
+    לפחות\s*(?P<he1>\d{1,2})\s*(?:\+)?\s*(?:שנה|שנים|שנות)\s*ניסיון |
+    (?P<he2>\d{1,2})\s*(?:\+)?\s*(?:שנה|שנים|שנות)\s*ניסיון
+"""
+
+# Single-pass union of the EN/HE patterns (one named group per alternative)
+YEARS_RE = re.compile(
+    "(?:" + EN_YEARS_SRC + ")|(?:" + HE_YEARS_SRC + ")",
     re.IGNORECASE | re.VERBOSE
 )
 
-def extract_years_from_text(text: str) -> float:
-    if not text:
-        return np.nan
-    t = str(text)
-    ens = [int(m.group(1) or m.group(2) or m.group(3)) for m in EN_YEARS_RE.finditer(t)]
-    hes = [int(m.group(1) or m.group(2)) for m in HE_YEARS_RE.finditer(t)]
-    all_vals = ens + hes
-    if not all_vals:
-        return np.nan
-    return float(min(all_vals))
-
 
 # --------- Seniority bucket (title + years) ---------
-def seniority_bucket(title: str, years_required: float) -> str:
-    t = (title or "").lower()
-    if re.search(r"\b(manager|head|director|vp)\b", t):
-        return "Manager+"
-    if re.search(r"\b(lead|principal|staff)\b", t):
-        return "Lead/Principal"
-    if re.search(r"\b(intern|student|junior|entry)\b", t):
-        return "Junior/Entry"
-    if re.search(r"\b(senior|sr\.?)\b", t):
-        return "Senior"
-    if isinstance(years_required, (int, float)) and not np.isnan(years_required):
-        y = float(years_required)
-        if y <= 1:
-            return "Junior/Entry"
-        if 1 < y < 5:
-            return "Mid"
-        if 5 <= y < 8:
-            return "Senior"
-        if y >= 8:
-            return "Lead/Principal"
-    return "Mid"
+_MGR_RE = re.compile(r"\b(?:manager|head|director|vp)\b", re.IGNORECASE)
+_LEAD_RE = re.compile(r"\b(?:lead|principal|staff)\b", re.IGNORECASE)
+_JR_RE = re.compile(r"\b(?:intern|student|junior|entry)\b", re.IGNORECASE)
+_SR_RE = re.compile(r"\b(?:senior|sr\.?)\b", re.IGNORECASE)
+
+def seniority_bucket(title: pd.Series, years_required: pd.Series) -> np.ndarray:
+    t = title.fillna("")
+    y = years_required.astype(float)
+    # First matching rule wins; title keywords beat years (NaN years fall through to "Mid")
+    return np.select(
+        [
+            t.str.contains(_MGR_RE.pattern, flags=re.IGNORECASE, regex=True),
+            t.str.contains(_LEAD_RE.pattern, flags=re.IGNORECASE, regex=True),
+            t.str.contains(_JR_RE.pattern, flags=re.IGNORECASE, regex=True),
+            t.str.contains(_SR_RE.pattern, flags=re.IGNORECASE, regex=True),
+            y <= 1,
+            y < 5,
+            y < 8,
+            y >= 8,
+        ],
+        ["Manager+", "Lead/Principal", "Junior/Entry", "Senior",
+         "Junior/Entry", "Mid", "Senior", "Lead/Principal"],
+        default="Mid",
+    )
 
 # ---------------------- UI ----------------------
 st.set_page_config(page_title="Jobs Dashboard — Data Scientist (IL)", page_icon=None, layout="wide")
@@ -303,62 +397,57 @@ with st.sidebar:
     q = st.text_input("Keyword in title/description/company", value="", placeholder="e.g., NLP, Computer Vision, Senior…")
 
     # Company filter
-    companies = sorted([c for c in df["company"].dropna().unique() if c])
+    companies = filter_options(CSV_PATH, "company")
     sel_companies = st.multiselect("Company", options=companies, default=[])
 
     # Source filter
-    sources = sorted([s for s in df["source"].dropna().unique() if s])
+    sources = filter_options(CSV_PATH, "source")
     sel_sources = st.multiselect("Source", options=sources, default=[])
 
     # City / location
-    cities = sorted([c for c in df["city_hint"].dropna().unique() if c])
+    cities = filter_options(CSV_PATH, "city_hint")
     sel_cities = st.multiselect("City (canonical)", options=cities, default=[])
 
     # Keep only “Only open”
     only_open = st.checkbox("Only open roles", value=True)
 
     # Date range
-    if "date_posted" in df.columns and df["date_posted"].notna().any():
-        min_dt = pd.to_datetime(df["date_posted"]).min()
-        max_dt = pd.to_datetime(df["date_posted"]).max()
+    min_dt, max_dt = df.attrs.get("dt_min", pd.NaT), df.attrs.get("dt_max", pd.NaT)
+    if pd.notna(min_dt):
         date_range = st.date_input(
             "Date posted range (UTC)",
-            value=(min_dt.date() if pd.notna(min_dt) else None,
-                   max_dt.date() if pd.notna(max_dt) else None)
+            value=(min_dt.date(), max_dt.date())
         )
     else:
         date_range = None
 
-# Apply filters
-f = df.copy()
-
-if q:
-    ql = q.lower().strip()
-    hay = (
-        f["role_lc"].fillna("")
-        + " || " + f["company"].str.lower().fillna("")
-        + " || " + f.get("About Us", pd.Series("", index=f.index)).astype(str).str.lower()
-        + " || " + f.get("About the Role", pd.Series("", index=f.index)).astype(str).str.lower()
-        + " || " + f.get("Qualifications", pd.Series("", index=f.index)).astype(str).str.lower()
-    )
-    f = f[hay.str.contains(ql, na=False)]
+# Apply filters (one boolean mask, sliced once)
+mask = np.ones(len(df), dtype=bool)
+
+# Literal substring match against the pre-lowercased haystack
+ql = q.lower().strip()
+if ql:
+    mask &= df["_haystack"].str.contains(ql, na=False, regex=False).to_numpy()
 
 if sel_companies:
-    f = f[f["company"].isin(sel_companies)]
+    mask &= df["company"].isin(sel_companies).to_numpy()
 
 if sel_sources:
-    f = f[f["source"].isin(sel_sources)]
+    mask &= df["source"].isin(sel_sources).to_numpy()
 
 if sel_cities:
-    f = f[f["city_hint"].isin(sel_cities)]
+    mask &= df["city_hint"].isin(sel_cities).to_numpy()
 
-if only_open and "is_open" in f.columns:
-    f = f[f["is_open"] == True]
+if only_open and "is_open" in df.columns:
+    mask &= (df["is_open"] == True).to_numpy()
 
-if date_range and "date_posted" in f.columns:
+if date_range and "date_posted" in df.columns:
     start, end = date_range if isinstance(date_range, tuple) else (date_range, date_range)
-    if start: f = f[f["date_posted"].dt.date >= start]
-    if end:   f = f[f["date_posted"].dt.date <= end]
+    posted = df["date_posted"].dt.date
+    if start: mask &= (posted >= start).to_numpy()
+    if end:   mask &= (posted <= end).to_numpy()
+
+f = df.loc[mask]
 
 # KPIs
 k1, k2, k3, k4 = st.columns(4)
@@ -379,25 +468,26 @@ cc1, cc2 = st.columns(2)
 
 with cc1:
     if "posted_date" in f.columns and f["posted_date"].notna().any():
-        g = (f.dropna(subset=["posted_date"])
-               .groupby("posted_date", as_index=False)
-               .size())
-        fig = px.bar(g, x="posted_date", y="size", title="Roles by posted date")
-        fig.update_layout(margin=dict(l=10,r=10,t=40,b=10))
+        g = (f["posted_date"].value_counts()
+               .sort_index()
+               .rename_axis("posted_date")
+               .reset_index(name="size"))
+        fig = make_bar(tuple(g["posted_date"]), tuple(g["size"]), title="Roles by posted date")
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("No 'date_posted' available for time-series chart.")
 
 with cc2:
     top_companies = (
-        f.groupby("company", as_index=False)
-         .size()
-         .sort_values("size", ascending=False)
+        f["company"].value_counts()
+         .loc[lambda s: s > 0]
          .head(20)
+         .rename_axis("company")
+         .reset_index(name="size")
     )
     if not top_companies.empty:
-        fig = px.bar(top_companies, x="company", y="size", title="Top companies (by count)")
-        fig.update_layout(xaxis_tickangle=-45, margin=dict(l=10,r=10,t=40,b=10))
+        fig = make_bar(tuple(top_companies["company"]), tuple(top_companies["size"]),
+                       title="Top companies (by count)", tickangle=-45)
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("No company data to chart.")
@@ -405,13 +495,13 @@ with cc2:
 st.markdown("### Roles by seniority")
 if "seniority" in f.columns and len(f):
     by_sen = (
-        f.groupby("seniority", as_index=False)
-         .size()
-         .sort_values("size", ascending=False)
+        f["seniority"].value_counts()
+         .loc[lambda s: s > 0]
+         .rename_axis("seniority")
+         .reset_index(name="size")
     )
     if not by_sen.empty:
-        fig = px.bar(by_sen, x="seniority", y="size", title=None)
-        fig.update_layout(margin=dict(l=10,r=10,t=10,b=10))
+        fig = make_bar(tuple(by_sen["seniority"]), tuple(by_sen["size"]))
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("No seniority distribution available.")
@@ -421,18 +511,14 @@ st.divider()
 # Table (paged) + actions
 st.subheader("Results")
 
-show_cols = [c for c in ["title","company","location","date_posted","is_open","source","years_required","seniority","link"] if c in f.columns]
+show_cols = export_cols(f)
 if not show_cols:
     show_cols = f.columns.tolist()
 
-def mk_link(url):
-    if isinstance(url, str) and url.startswith("http"):
-        return f'<a href="{url}" target="_blank">Open</a>'
-    return ""
-
 tbl = f.copy()
 if "link" in tbl.columns:
-    tbl["open"] = tbl["link"].map(mk_link)
+    link = tbl["link"].fillna("").astype(str)
+    tbl["open"] = np.where(link.str.startswith("http"), '<a href="' + link + '" target="_blank">Open</a>', "")
     if "link_canonical" in tbl.columns:
         show_cols = [c for c in show_cols if c != "link_canonical"]
     show_cols = [c for c in show_cols if c != "link"] + ["open"]
@@ -454,10 +540,11 @@ st.dataframe(
 # Download filtered CSV
 st.download_button(
     "Download filtered as CSV",
-    data=df_to_csv_download(f.drop(columns=["role_lc"], errors="ignore")),
+    data=filtered_csv(CSV_PATH, tuple(f.index)),
     file_name="jobs_filtered.csv",
     mime="text/csv",
 )
 
-with st.expander("Advanced: show raw JSON (first 100 rows)"):
-    st.code(f.head(100).to_json(orient="records", force_ascii=False, indent=2), language="json")
+# Checkbox rather than expander: expander bodies run on every rerun even when collapsed
+if st.checkbox("Advanced: show raw JSON (first 100 rows)", value=False):
+    st.code(f.head(100)[export_cols(f)].to_json(orient="records", force_ascii=False, indent=2), language="json")
@@ -3,12 +3,22 @@ import time
 import json
 import html
 import csv
+import hashlib
 import os
+import sqlite3
 import unicodedata
+import ahocorasick
+import threading
 import datetime as dt
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from typing import Dict, List, Optional
+from urllib.parse import urlparse
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, Tag
 from datetime import datetime, timezone
 try:
     from zoneinfo import ZoneInfo  
@@ -23,12 +33,27 @@ TIMEOUT = 30
 SERPER_HEADERS = {"X-API-KEY": SERPER_KEY, "Content-Type": "application/json"}
 UA = "Mozilla/5.0 (compatible; JobScraper/1.0; +https://example.com/bot)"  
 
+# Shared keep-alive pool; transient errors and 429s are retried with backoff
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=32, pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+))
+SESSION.headers["User-Agent"] = UA
+
 CSV_PATH = "jobs_serper.csv"
 MAX_PAGES = 8
 SLEEP_BETWEEN = 0.6
+SERPER_WORKERS = 5           # queries searched concurrently (pages within a query stay sequential)
 
 DETAIL_ENRICH_BUDGET = 120
 DETAIL_SLEEP = 0.9
+DETAIL_WORKERS = 12          # concurrent LinkedIn detail fetches
+HOST_MAX_PER_WINDOW = 4      # at most this many request starts per host ...
+HOST_WINDOW = DETAIL_SLEEP   # ... per this many seconds
+
+ENRICH_CACHE_PATH = "linkedin_enrich_cache.sqlite"
+ENRICH_CACHE_TTL = 48 * 3600   # seconds a parsed detail page is reused without any request
 
 DEBUG = False
 def dbg(*args):
@@ -50,16 +75,24 @@ IL_TOKENS = [
     "jerusalem","ירושלים","maale adumim","מעלה אדומים","beit shemesh","בית שמש",
     "remote israel","remote in israel","hybrid israel","היברידי ישראל","עבודה מרחוק בישראל",
 ]
+_IL_AC = ahocorasick.Automaton()
+for _tok in IL_TOKENS:
+    _IL_AC.add_word(_tok, _tok)
+_IL_AC.make_automaton()
 
 def is_israel(text: str) -> bool:
     if not text:
         return False
-    return any(tok in text.lower() for tok in IL_TOKENS)
+    return next(_IL_AC.iter(text.casefold()), None) is not None
 
 # Position Link
 JOB_LINK_RE = re.compile(r"^https?://(?:[a-z]{2,3}\.)?linkedin\.com/jobs/view/[\w-]*\d+(?:/|$)", re.I)
+_JOBID_RE = re.compile(r"/jobs/view/[\w-]*?(\d+)")
+_WS_RE = re.compile(r"\s+")
+_TRAIL_WS_RE = re.compile(r"[ \t]+\n")
+@lru_cache(maxsize=65536)
 def canonicalize_job_link(link: str) -> str:
-    m = re.search(r"/jobs/view/[\w-]*?(\d+)", link or "")
+    m = _JOBID_RE.search(link or "")
     if not m:
         return link or ""
     job_id = m.group(1)
@@ -69,13 +102,18 @@ def canonicalize_job_link(link: str) -> str:
 def utc_now_iso():
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
-def normalize_text(s: str) -> str:
+def normalize_text(s) -> str:
+    # JSON-LD fields can be lists/dicts (e.g. employmentType); coerce before the str-keyed cache
     if not s:
         return ""
-    s = html.unescape(str(s))
+    return _normalize_str(s if isinstance(s, str) else str(s))
+
+@lru_cache(maxsize=65536)
+def _normalize_str(s: str) -> str:
+    s = html.unescape(s)
     s = unicodedata.normalize("NFKC", s)
     s = "".join(ch for ch in s if unicodedata.category(ch)[0] != "C" or ch in ("\n", "\t"))
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _WS_RE.sub(" ", s).strip()
     return s
 
 def is_target_title(text: str) -> bool:
@@ -83,15 +121,17 @@ def is_target_title(text: str) -> bool:
     t = text.lower()
     return "data scientist" in t or "מדען נתונים" in t
 
-def clean_html_to_text(raw_html: str) -> str:
+def clean_html_to_text(raw_html) -> str:
+    """Text of an HTML string, or of an already-parsed node (no re-parse)."""
+    if isinstance(raw_html, Tag): return raw_html.get_text(separator="\n", strip=True)
     if not raw_html: return ""
-    soup = BeautifulSoup(html.unescape(raw_html), "html.parser")
+    soup = BeautifulSoup(html.unescape(raw_html), "lxml")
     return soup.get_text(separator="\n", strip=True)
 
 def split_sections_free(text: str) -> dict:
     sections = {"about_role":"", "responsibilities":"", "qualifications":"", "benefits":""}
     if not text: return sections
-    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = _TRAIL_WS_RE.sub("\n", text)
     anchors = {
         "about_role":[
             r"about the role", r"role overview", r"in this (position|role)", 
@@ -132,15 +172,19 @@ def split_sections_free(text: str) -> dict:
             sections[key] = (sections[key]+"\n"+chunk).strip() if sections[key] else chunk
     return sections
 
+FIELDS = [
+    "id","title","company","location","date_posted","link","source",
+    "About Us","About the Role","What You'll Be Doing","Qualifications",
+    "Life at","In the News","raw_description_html","scraped_at",
+    "is_open","status","stale_at"
+]
+_DEFAULTS = dict.fromkeys(FIELDS, "")
+
 def ensure_schema(row: dict) -> dict:
-    cols = [
-        "id","title","company","location","date_posted","link","source",
-        "About Us","About the Role","What You'll Be Doing","Qualifications",
-        "Life at","In the News","raw_description_html","scraped_at",
-        "is_open","status","stale_at"
-    ]
-    for c in cols: row.setdefault(c, "")
-    return row
+    """New dict: every FIELDS column (default "") overlaid with row."""
+    out = _DEFAULTS.copy()
+    out.update(row)
+    return out
 
 # ========= Serper =========
 def serper_site_search(query: str, start: int = 0):
@@ -150,13 +194,24 @@ def serper_site_search(query: str, start: int = 0):
     
     payload = {"q": query, "start": start, "hl": "en", "gl": "il"}
     try:
-        r = requests.post(url, headers=SERPER_HEADERS, json=payload, timeout=TIMEOUT)
+        r = SESSION.post(url, headers=SERPER_HEADERS, json=payload, timeout=TIMEOUT)
         r.raise_for_status()
         return (r.json() or {}).get("organic", []) or []
     except Exception as e:
         print(f"Serper search error: {e}")
         return []
 
+def fetch_query_pages(query: str, max_pages: int, sleep_between: float) -> list:
+    """Serper result pages for one query, up to and including the first empty one."""
+    pages = []
+    for page in range(max_pages):
+        items = serper_site_search(query=query, start=page * 10)
+        pages.append(items)
+        if not items:
+            break
+        if sleep_between > 0: time.sleep(sleep_between)
+    return pages
+
 # ========= Date =========
 REL_EN = re.compile(r"\b(\d+)\s+(second|minute|hour|day|week|month|year)s?\s+ago\b", re.I)
 REL_HE = re.compile(r"(?:לפני)\s+(\d+)\s+(שניות|שניה|דקות|דקה|שעות|שעה|ימים|יום|שבועות|שבוע|חודשים|חודש|שנים|שנה)")
@@ -283,9 +338,14 @@ def extract_location(soup: BeautifulSoup, json_ld: dict, og_title: str, og_desc:
 # ========= Analysis of Linkedin Page =========
 JSONLD_RE = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.I|re.S)
 
-def parse_jsonld(html_text: str) -> dict:
-    for m in JSONLD_RE.finditer(html_text or ""):
-        try: obj = json.loads(m.group(1))
+def parse_jsonld(page) -> dict:
+    """JobPosting JSON-LD from an already-parsed page (preferred) or a raw HTML string."""
+    if isinstance(page, Tag):
+        blobs = [s.string or "" for s in page.find_all("script", attrs={"type": "application/ld+json"})]
+    else:
+        blobs = [m.group(1) for m in JSONLD_RE.finditer(page or "")]
+    for blob in blobs:
+        try: obj = json.loads(blob)
         except Exception: continue
         if isinstance(obj, list):
             for it in obj:
@@ -325,8 +385,8 @@ def extract_company_from_page(soup: BeautifulSoup, json_ld: dict) -> str:
                 if txt: return txt
     return ""
 
-def is_job_active(soup: BeautifulSoup, json_ld: dict, page_text: str) -> bool:
-    pt = page_text.lower()
+def is_job_active(soup: BeautifulSoup, json_ld: dict, pt: str) -> bool:
+    """pt: the page text, already lowercased."""
     closed = [
         "no longer accepting applications","this job is no longer available",
         "position has been filled","applications are closed","we are no longer reviewing applications",
@@ -345,19 +405,90 @@ def is_job_active(soup: BeautifulSoup, json_ld: dict, page_text: str) -> bool:
     apply_text = any(k in pt for k in ["easy apply","apply now","submit application","הגש מועמדות","הגשת מועמדות"])
     return apply_btn or apply_text or ("no longer" not in pt and "אינה זמינה" not in pt)
 
+# ========= Per-host throttle =========
+_host_hits = defaultdict(deque)
+_host_lock = threading.Lock()
+
+def throttle(url: str):
+    """Block until a request to url's host fits the sliding window (shared by all worker threads)."""
+    host = urlparse(url).netloc
+    while True:
+        with _host_lock:
+            now = time.monotonic()
+            hits = _host_hits[host]
+            while hits and now - hits[0] >= HOST_WINDOW:
+                hits.popleft()
+            if len(hits) < HOST_MAX_PER_WINDOW:
+                hits.append(now)
+                return
+            wait = HOST_WINDOW - (now - hits[0])
+        time.sleep(wait)
+
+# ========= Enrichment cache (parsed job_info per canonical link, across runs) =========
+_cache_lock = threading.Lock()
+_cache_conn = None
+
+def _enrich_cache():
+    global _cache_conn
+    if _cache_conn is None:
+        _cache_conn = sqlite3.connect(ENRICH_CACHE_PATH, check_same_thread=False, isolation_level=None)
+        _cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS enrich ("
+            "link TEXT PRIMARY KEY, info TEXT, etag TEXT, last_modified TEXT, fetched_at REAL)"
+        )
+    return _cache_conn
+
+def cache_get(link: str) -> Optional[dict]:
+    try:
+        with _cache_lock:
+            row = _enrich_cache().execute(
+                "SELECT info, etag, last_modified, fetched_at FROM enrich WHERE link = ?", (link,)
+            ).fetchone()
+    except sqlite3.Error as e:
+        dbg("enrich cache read failed:", e)
+        return None
+    if not row:
+        return None
+    return {"info": json.loads(row[0]), "etag": row[1], "last_modified": row[2], "fetched_at": row[3]}
+
+def cache_put(link: str, info: dict, etag: str = "", last_modified: str = ""):
+    try:
+        with _cache_lock:
+            _enrich_cache().execute(
+                "INSERT OR REPLACE INTO enrich VALUES (?, ?, ?, ?, ?)",
+                (link, json.dumps(info, ensure_ascii=False), etag, last_modified, time.time()),
+            )
+    except sqlite3.Error as e:
+        dbg("enrich cache write failed:", e)
+
 def enrich_from_linkedin(link: str, serper_title: str = "") -> dict:
+    cached = cache_get(link)
+    if cached and not cached["info"].get("title"):
+        cached = None  # entry written before block/authwall pages were kept out of the cache
+    if cached and time.time() - cached["fetched_at"] < ENRICH_CACHE_TTL:
+        return cached["info"]
+
+    headers = {}
+    if cached and cached["etag"]: headers["If-None-Match"] = cached["etag"]
+    if cached and cached["last_modified"]: headers["If-Modified-Since"] = cached["last_modified"]
+
+    throttle(link)
     try:
-        response = requests.get(link, timeout=TIMEOUT, headers={"User-Agent": UA})
+        response = SESSION.get(link, timeout=TIMEOUT, headers=headers)
+        if response.status_code == 304 and cached:
+            cache_put(link, cached["info"], cached["etag"], cached["last_modified"])
+            return cached["info"]
         response.raise_for_status()
     except Exception as e:
         dbg("detail fetch failed:", e)
         return {"is_open": False}
 
     html_text = response.text
-    soup = BeautifulSoup(html_text, "html.parser")
+    soup = BeautifulSoup(html_text, "lxml")
     page_text = soup.get_text(" ")
+    page_text_lower = page_text.lower()
 
-    json_ld = parse_jsonld(html_text)
+    json_ld = parse_jsonld(soup)
 
     title = ""
     if isinstance(json_ld, dict) and json_ld.get("title"):
@@ -380,15 +511,16 @@ def enrich_from_linkedin(link: str, serper_title: str = "") -> dict:
         og_desc_str = normalize_text(og_desc["content"])
 
     location = extract_location(soup, json_ld, og_title_str, og_desc_str)
-    is_active = is_job_active(soup, json_ld, page_text)
+    is_active = is_job_active(soup, json_ld, page_text_lower)
 
+    # One lower() + automaton scan over all fields; " | " keeps tokens from spanning two fields
     is_israel_job = (
-        is_israel(title) or is_israel(company) or is_israel(location) or
-        is_israel(og_title_str) or is_israel(og_desc_str) or
-        " israel " in page_text.lower() or " ישראל " in page_text
+        is_israel(" | ".join((title, company, location, og_title_str, og_desc_str))) or
+        " israel " in page_text_lower or " ישראל " in page_text
     )
 
     description_html = ""
+    description_text = ""
     if isinstance(json_ld, dict) and json_ld.get("description"):
         description_html = json_ld["description"]
     if not description_html:
@@ -399,28 +531,58 @@ def enrich_from_linkedin(link: str, serper_title: str = "") -> dict:
             element = soup.select_one(selector)
             if element:
                 description_html = str(element)
+                description_text = clean_html_to_text(element)  # same parse, no HTML round-trip
                 break
 
     employment_type = normalize_text(json_ld.get("employmentType","")) if isinstance(json_ld, dict) else ""
     date_raw = (json_ld.get("datePosted") or "").strip() if isinstance(json_ld, dict) else ""
     date_posted_iso = coerce_date_to_iso(date_raw, soup, page_text)
 
-    return {
+    job_info = {
         "is_open": bool(is_active and is_israel_job),
         "title": title,
         "company": company,
         "location": location,
         "date_posted": date_posted_iso,
         "description_html": description_html,
+        "description_text": description_text,
         "employment_type": employment_type,
         "is_israel": is_israel_job
     }
+    # LinkedIn answers bot blocks with 999 / an authwall page, which raise_for_status lets through;
+    # only a real job page (200 with JSON-LD or a title) may be reused for ENRICH_CACHE_TTL
+    if response.status_code == 200 and (isinstance(json_ld, dict) or title):
+        cache_put(link, job_info, response.headers.get("ETag", ""), response.headers.get("Last-Modified", ""))
+    return job_info
 
 # ========= Scan =========
-def crawl_serper(max_pages=MAX_PAGES, sleep_between=SLEEP_BETWEEN):
+def build_row(link: str, title: str, company: str, location: str, date_posted: str,
+              desc_html: str, is_open_val: str, desc_text: str = "", scraped_at: str = "") -> dict:
+    desc_text = desc_text or clean_html_to_text(desc_html)
+    sections = split_sections_free(desc_text)
+    return ensure_schema({
+        "id": f"serper:{hashlib.blake2b(link.encode('utf-8'), digest_size=8).hexdigest()}",  # stable across runs
+        "title": title,
+        "company": company,
+        "location": location,
+        "date_posted": date_posted,
+        "link": link,
+        "source": "google_search/serper+linkedin",
+        "raw_description_html": desc_html,
+        "scraped_at": scraped_at or utc_now_iso(),
+        "About Us": sections.get("about_role", ""),
+        "About the Role": sections.get("about_role", ""),
+        "What You'll Be Doing": sections.get("responsibilities", ""),
+        "Qualifications": sections.get("qualifications", ""),
+        "Life at": sections.get("benefits", ""),
+        "In the News": "",
+        "is_open": is_open_val,
+    })
+
+def crawl_serper(max_pages=MAX_PAGES, sleep_between=SLEEP_BETWEEN, max_workers=DETAIL_WORKERS):
     rows = []
     seen_links = set()
-    enrich_left = DETAIL_ENRICH_BUDGET
+    candidates = []  # (link, serper_title, serper_snippet, query), in discovery order
 
     city_terms = [
         '"Tel Aviv"','"Jerusalem"','"Haifa"','"Beer Sheva"','"Herzliya"','"Ramat Gan"','"Givatayim"',
@@ -440,160 +602,134 @@ def crawl_serper(max_pages=MAX_PAGES, sleep_between=SLEEP_BETWEEN):
         queries.append(f'site:il.linkedin.com/jobs/view "Data Scientist" {ct}')
 
     total_processed = 0
-    total_kept = 0
-
-    for query_idx, query in enumerate(queries):
-        print(f"\n[Query {query_idx + 1}/{len(queries)}] {query}")
-        for page in range(max_pages):
-            print(f"  Page {page + 1}...")
-            items = serper_site_search(query=query, start=page * 10)
-            if not items:
-                print("    No more results for this query")
-                break
 
-            page_processed = 0
-            page_kept = 0
-
-            for item in items:
-                link_raw = normalize_text(item.get("link") or "")
-                if not link_raw:
-                    continue
-                link = canonicalize_job_link(link_raw)
-
-                if not JOB_LINK_RE.match(link):
-                    dbg(f"      X Not LinkedIn job link: {link_raw}")
-                    continue
-                if link in seen_links:
-                    dbg(f"      X Already seen: {link}")
-                    continue
-                seen_links.add(link)
-
-                serper_title = normalize_text(item.get("title") or "")
-                serper_snippet = normalize_text(item.get("snippet") or "")
-
-                if not (is_target_title(serper_title) or is_target_title(serper_snippet)):
-                    continue
-
-                total_processed += 1
-                page_processed += 1
-
-                if enrich_left > 0:
-                    job_info = enrich_from_linkedin(link, serper_title)
-                    open_flag = bool(job_info.get("is_open", False))
-                    if not open_flag or not job_info.get("is_israel", False):
-                        dbg("      X Skip (closed or not Israel)")
+    # Phase 1: Serper results -> filtered, de-duplicated candidates. Queries are fetched
+    # concurrently; results are consumed here in query order so dedup stays deterministic.
+    with ThreadPoolExecutor(max_workers=SERPER_WORKERS) as pool:
+        query_pages = pool.map(lambda q: fetch_query_pages(q, max_pages, sleep_between), queries)
+        for query_idx, (query, pages) in enumerate(zip(queries, query_pages)):
+            print(f"\n[Query {query_idx + 1}/{len(queries)}] {query}")
+            for page, items in enumerate(pages):
+                print(f"  Page {page + 1}...")
+                if not items:
+                    print("    No more results for this query")
+                    break
+
+                page_processed = 0
+
+                for item in items:
+                    link_raw = normalize_text(item.get("link") or "")
+                    if not link_raw:
+                        continue
+                    link = canonicalize_job_link(link_raw)
+
+                    if not JOB_LINK_RE.match(link):
+                        dbg(f"      X Not LinkedIn job link: {link_raw}")
+                        continue
+                    if link in seen_links:
+                        dbg(f"      X Already seen: {link}")
                         continue
+                    seen_links.add(link)
 
-                    title = job_info.get("title") or serper_title
-                    company = job_info.get("company", "")
-                    location = job_info.get("location", "")
-                    date_posted = job_info.get("date_posted", "")
-                    desc_html = job_info.get("description_html", "")
-                    is_open_val = "true"
-
-                    if not location:
-                        loc_from_result = extract_location_from_texts(serper_title, serper_snippet)
-                        location = loc_from_result or infer_city_from_query(query)
-
-                    enrich_left -= 1
-                    time.sleep(DETAIL_SLEEP)
-                else:
-                    if not (is_israel(serper_title) or is_israel(serper_snippet)):
+                    serper_title = normalize_text(item.get("title") or "")
+                    serper_snippet = normalize_text(item.get("snippet") or "")
+
+                    if not (is_target_title(serper_title) or is_target_title(serper_snippet)):
                         continue
-                    title = serper_title
-                    company = ""
-                    desc_html = ""
-                    date_posted = ""
-                    location = extract_location_from_texts(serper_title, serper_snippet) or infer_city_from_query(query)
-                    is_open_val = "unknown"
-
-                desc_text = clean_html_to_text(desc_html)
-                sections = split_sections_free(desc_text)
-
-                row = ensure_schema({
-                    "id": f"serper:{abs(hash(link))}",
-                    "title": title,
-                    "company": company,
-                    "location": location,
-                    "date_posted": date_posted,
-                    "link": link,
-                    "source": "google_search/serper+linkedin",
-                    "raw_description_html": desc_html,
-                    "scraped_at": utc_now_iso(),
-                    "About Us": sections.get("about_role", ""),
-                    "About the Role": sections.get("about_role", ""),
-                    "What You'll Be Doing": sections.get("responsibilities", ""),
-                    "Qualifications": sections.get("qualifications", ""),
-                    "Life at": sections.get("benefits", ""),
-                    "In the News": "",
-                    "is_open": is_open_val,
-                })
-                
-                rows.append(row)
-                total_kept += 1
-                page_kept += 1
-                print(f"    V {company or '[unknown]'} — {title[:60]} | {location or 'N/A'} | {date_posted or 'no date'} | open={is_open_val}")
-
-            print(f"    Page summary: processed={page_processed}, kept={page_kept}")
-            if SLEEP_BETWEEN>0: time.sleep(SLEEP_BETWEEN)
+
+                    total_processed += 1
+                    page_processed += 1
+                    candidates.append((link, serper_title, serper_snippet, query))
+
+                print(f"    Page summary: processed={page_processed}")
+
+    # Phase 2: LinkedIn detail pages, fetched concurrently. Only kept (open + Israel) jobs use up
+    # the budget, so submit in rounds of (budget - kept): every candidate in a round would also
+    # have been enriched by a sequential scan.
+    job_infos = {}
+    kept_enriched = 0
+    next_idx = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while kept_enriched < DETAIL_ENRICH_BUDGET and next_idx < len(candidates):
+            batch = range(next_idx, min(len(candidates), next_idx + DETAIL_ENRICH_BUDGET - kept_enriched))
+            print(f"\n[Details] fetching {len(batch)} LinkedIn pages with {max_workers} workers")
+            futures = {pool.submit(enrich_from_linkedin, candidates[k][0], candidates[k][1]): k for k in batch}
+            for fut in as_completed(futures):
+                job_info = fut.result()
+                job_infos[futures[fut]] = job_info
+                if job_info.get("is_open", False) and job_info.get("is_israel", False):
+                    kept_enriched += 1
+            next_idx = batch.stop
+
+    scraped_time = utc_now_iso()
+    for k, (link, serper_title, serper_snippet, query) in enumerate(candidates):
+        job_info = job_infos.get(k)
+        if job_info is not None:
+            open_flag = bool(job_info.get("is_open", False))
+            if not open_flag or not job_info.get("is_israel", False):
+                dbg("      X Skip (closed or not Israel)")
+                continue
+
+            title = job_info.get("title") or serper_title
+            location = job_info.get("location", "")
+            if not location:
+                loc_from_result = extract_location_from_texts(serper_title, serper_snippet)
+                location = loc_from_result or infer_city_from_query(query)
+
+            rows.append(build_row(link, title, job_info.get("company", ""), location,
+                                  job_info.get("date_posted", ""), job_info.get("description_html", ""), "true",
+                                  job_info.get("description_text", ""), scraped_time))
+        else:
+            # Over budget: keep Serper-only rows that look Israeli
+            if not (is_israel(serper_title) or is_israel(serper_snippet)):
+                continue
+            location = extract_location_from_texts(serper_title, serper_snippet) or infer_city_from_query(query)
+            rows.append(build_row(link, serper_title, "", location, "", "", "unknown", scraped_at=scraped_time))
+
+    for row in rows:
+        print(f"    V {row['company'] or '[unknown]'} — {row['title'][:60]} | {row['location'] or 'N/A'} | {row['date_posted'] or 'no date'} | open={row['is_open']}")
 
     print("\n[Crawl done]")
     print(f"Total processed: {total_processed}")
-    print(f"Total kept: {total_kept}")
-    print(f"Detail budget used: {DETAIL_ENRICH_BUDGET - enrich_left}/{DETAIL_ENRICH_BUDGET}")
+    print(f"Total kept: {len(rows)}")
+    print(f"Detail budget used: {kept_enriched}/{DETAIL_ENRICH_BUDGET}")
     return rows
 
 # ========= Save: upsert + stale =========
 def upsert_and_mark_stale(path, new_rows):
-    base_fields = [
-        "id","title","company","location","date_posted","link","source",
-        "About Us","About the Role","What You'll Be Doing","Qualifications",
-        "Life at","In the News","raw_description_html","scraped_at",
-        "is_open","status","stale_at"
-    ]
-
     def _canon_link(x):
         try: return canonicalize_job_link(x or "")
         except Exception: return x or ""
 
     prepared_new = []
     for r in new_rows:
-        rr = ensure_schema(dict(r))
+        rr = ensure_schema(r)
         rr["link"] = _canon_link(rr.get("link",""))
-        if "status" not in rr: rr["status"] = ""
-        if "stale_at" not in rr: rr["stale_at"] = ""
         prepared_new.append(rr)
 
     existing = []
     if os.path.exists(path):
-        try:
-            import pandas as pd
-            try:
-                df = pd.read_csv(path, encoding="utf-8-sig")
-            except Exception:
-                df = pd.read_csv(path, encoding="utf-8")
-            existing = df.to_dict(orient="records")
-        except Exception:
-            with open(path, "r", encoding="utf-8-sig", newline="") as f:
-                reader = csv.DictReader(f)
-                existing = list(reader)
+        # utf-8-sig also reads BOM-less UTF-8. Older writes left a literal "nan" in empty cells.
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            existing = [{k: ("" if v == "nan" else v) for k, v in r.items()} for r in csv.DictReader(f)]
 
     existing_by_link = {}
-    all_fields = set(base_fields)
+    all_fields = set(FIELDS)
     for row in existing:
         for k in ("is_open","status","stale_at"): row.setdefault(k, "")
         row["link"] = _canon_link(row.get("link",""))
         existing_by_link[row.get("link","")] = row
         all_fields.update(row.keys())
 
-    current_links = {_canon_link(r.get("link","")) for r in prepared_new if r.get("link")}
+    current_links = frozenset(_canon_link(r.get("link","")) for r in prepared_new if r.get("link"))
 
     merged_rows = []
     now = utc_now_iso()
+    stale_count = 0
 
     for link, row in existing_by_link.items():
-        row = dict(row)  # copy
         if link and (link not in current_links):
+            stale_count += 1
             row["status"] = "stale"
             if "is_open" in row and str(row["is_open"]).lower() != "false":
                 row["is_open"] = "false"
@@ -612,19 +748,17 @@ def upsert_and_mark_stale(path, new_rows):
             all_fields.update(rr.keys())
 
     #save
-    fieldnames = list(base_fields)
+    fieldnames = list(FIELDS)
     for col in sorted(all_fields):
         if col not in fieldnames:
             fieldnames.append(col)
 
     #writing to file
-    with open(path, "w", newline="", encoding="utf-8-sig") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for r in merged_rows:
-            w.writerow({k: r.get(k, "") for k in fieldnames})
+    with open(path, "w", newline="", encoding="utf-8-sig", buffering=1 << 20) as f:
+        w = csv.writer(f)
+        w.writerow(fieldnames)
+        w.writerows([r.get(k, "") for k in fieldnames] for r in merged_rows)
 
-    stale_count = sum(1 for l in existing_by_link if l not in current_links)
     print(f"V Upsert complete. Wrote {len(merged_rows)} rows to {path} (new={new_count}, stale={stale_count})")
 
 # ========= Main =========
@@ -1,5 +1,5 @@
 # merge_jobs.py
-import os, re, glob, html, unicodedata
+import os, re, glob, html, codecs, unicodedata
 from datetime import datetime
 import pandas as pd
 
@@ -16,12 +16,14 @@ ENCODINGS = ["utf-8-sig", "utf-8", "cp1255"]  # Try loading with multiple encodi
 
 # --------- Helpers ---------
 JOB_LINK_RE = re.compile(r"^https?://(?:[a-z]{2,3}\.)?linkedin\.com/jobs/view/[\w-]*\d+(?:/|$)", re.I)
+_WS_RE = re.compile(r"\s+")
+_JOBID_RE = re.compile(r"/jobs/view/[\w-]*?(\d+)")
 
 def canonicalize_job_link(link: str) -> str:
     """Normalize LinkedIn job links to a canonical form."""
     if not isinstance(link, str) or not link:
         return ""
-    m = re.search(r"/jobs/view/[\w-]*?(\d+)", link)
+    m = _JOBID_RE.search(link)
     if not m:
         return link
     job_id = m.group(1)
@@ -32,14 +34,40 @@ def normalize_text(s: str) -> str:
     if s is None: return ""
     s = html.unescape(str(s))
     s = unicodedata.normalize("NFKC", s)
-    return re.sub(r"\s+", " ", s).strip()
+    return _WS_RE.sub(" ", s).strip()
+
+def normalize_text_series(s: pd.Series) -> pd.Series:
+    """Column-wise normalize_text: only html.unescape stays per-cell, the rest uses .str."""
+    s = s.fillna("").astype(str).map(html.unescape)
+    return s.str.normalize("NFKC").str.replace(_WS_RE, " ", regex=True).str.strip()
+
+def canonicalize_job_link_series(links: pd.Series) -> pd.Series:
+    """Column-wise canonicalize_job_link."""
+    links = links.fillna("").astype(str)
+    job_id = links.str.extract(_JOBID_RE, expand=False)
+    return ("https://www.linkedin.com/jobs/view/" + job_id + "/").fillna(links)
+
+def sniff_encoding(path: str, sample_size: int = 64 * 1024) -> str:
+    """utf-8-sig if the file starts with a BOM, utf-8 if a leading sample decodes, else cp1255."""
+    with open(path, "rb") as fh:
+        head = fh.read(sample_size)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1255"
 
 def load_csv_any(path: str) -> pd.DataFrame:
-    """Try reading CSV with several encodings."""
+    """Read CSV as plain strings, sniffed encoding first and the others as fallback."""
+    first = sniff_encoding(path)
     last_err = None
-    for enc in ENCODINGS:
+    for enc in [first] + [e for e in ENCODINGS if e != first]:
         try:
-            return pd.read_csv(path, encoding=enc)
+            # Only the literal "nan" older upserts wrote counts as missing
+            return pd.read_csv(path, encoding=enc, dtype=str, engine="c",
+                               keep_default_na=False, na_values=["nan"])
         except Exception as e:
             last_err = e
             continue
@@ -83,11 +111,11 @@ def merge_job_csvs(input_globs=INPUT_GLOBS, output_path=OUTPUT_CSV):
         # Normalize common text fields
         for col in ["title","company","location","link","date_posted","source"]:
             if col in df.columns:
-                df[col] = df[col].map(normalize_text)
+                df[col] = normalize_text_series(df[col])
 
         # Canonicalize LinkedIn links
         if "link" in df.columns:
-            df["link_canonical"] = df["link"].map(canonicalize_job_link)
+            df["link_canonical"] = canonicalize_job_link_series(df["link"])
         else:
             df["link_canonical"] = ""
 
@@ -100,16 +128,15 @@ def merge_job_csvs(input_globs=INPUT_GLOBS, output_path=OUTPUT_CSV):
     merged = pd.concat(frames, ignore_index=True, sort=False)
 
     # Deduplicate: first by 'link_canonical', then by (title, company, location)
-    merged["__dedup_key"] = merged["link_canonical"]
-    fallback_mask = merged["__dedup_key"].eq("") | merged["__dedup_key"].isna()
-    merged.loc[fallback_mask, "__dedup_key"] = (
-        merged.get("title", "").astype(str).str.lower().fillna("") + "||" +
-        merged.get("company", "").astype(str).str.lower().fillna("") + "||" +
-        merged.get("location", "").astype(str).str.lower().fillna("")
-    )
+    no_link = (merged["link_canonical"].fillna("") == "").to_numpy()
+    dup = merged["link_canonical"].duplicated(keep="first").to_numpy() & ~no_link
+    if no_link.any():
+        fallback = merged.loc[no_link].reindex(columns=["title", "company", "location"], fill_value="")
+        fallback = fallback.apply(lambda s: s.fillna("").astype(str).str.lower())
+        dup[no_link] = fallback.duplicated(keep="first").to_numpy()
 
     before = len(merged)
-    merged = merged.drop_duplicates(subset=["__dedup_key"], keep="first")
+    merged = merged.loc[~dup]
     after = len(merged)
 
     # Preferred column order; keep other existing columns afterwards
@@ -121,7 +148,7 @@ def merge_job_csvs(input_globs=INPUT_GLOBS, output_path=OUTPUT_CSV):
         "Qualifications","Life at","In the News",
         "raw_description_html","scraped_at"
     ]
-    other_cols = [c for c in merged.columns if c not in preferred_cols + ["__dedup_key"]]
+    other_cols = [c for c in merged.columns if c not in preferred_cols]
     merged = merged[ [c for c in preferred_cols if c in merged.columns] + other_cols ]
 
     # Save output
@@ -1,13 +1,27 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import csv
 import html
 import re
-from bs4 import BeautifulSoup
+import ahocorasick
+from bs4 import BeautifulSoup, SoupStrainer
 from datetime import datetime, timezone
+from operator import itemgetter
+try:
+    import orjson  # faster decode of the multi-MB ?content=true board payload
+except ImportError:
+    orjson = None
 
 TIMEOUT = 30
 
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=32, pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
 FIELDS = [
     "id", "title", "location", "date_posted", "link", "source", "scraped_at",
     "About Us", "About the Role", "What You'll Be Doing", "Qualifications",
@@ -15,18 +29,28 @@ FIELDS = [
     "status", "stale_at",
 ]
 
+_DEFAULTS = dict.fromkeys(FIELDS, "")
+# FIELDS-ordered values of a schema-complete row, pulled in one C call
+_ROW_VALUES = itemgetter(*FIELDS)
+
 def ensure_schema(row: dict) -> dict:
-    for c in FIELDS:
-        row.setdefault(c, "")
-    return row
+    """New dict: every FIELDS column (default "") overlaid with row."""
+    out = _DEFAULTS.copy()
+    out.update(row)
+    return out
 
 def utc_now_iso():
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
+# Already in the form pick_date normalizes to (UTC, whole seconds)
+_ISO_UTC_RE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\+00:00\Z")
+
 def pick_date(job: dict) -> str:
     raw = (job.get("updated_at") or job.get("created_at") or "").strip()
     if not raw:
         return ""
+    if _ISO_UTC_RE.match(raw):
+        return raw
     try:
         if raw.endswith("Z"):
             dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
@@ -52,17 +76,34 @@ IL_CITY_TOKENS = {
     "karmiel", "כרמיאל", "hod hasharon", "הוד השרון", "bat yam", "בת ים",
     "kiryat", "קריית"
 }
+# One automaton over both token sets: a single scan per string
+_IL_AC = ahocorasick.Automaton()
+for _tok in IL_STRICT_TOKENS | IL_CITY_TOKENS:
+    _IL_AC.add_word(_tok, _tok)
+_IL_AC.make_automaton()
+
 def is_israel_location(loc: str) -> bool:
     if not loc:
         return False
-    t = loc.lower()
-    if any(tok in t for tok in IL_STRICT_TOKENS):
-        return True
-    return any(tok in t for tok in IL_CITY_TOKENS)
+    return next(_IL_AC.iter(loc.casefold()), None) is not None
+
+# Only the tags parse_greenhouse_description walks
+SECTION_STRAINER = SoupStrainer(["h2", "h3", "p", "li"])
+
+# Heading -> section, first match wins (run on the lowercased heading).
+# The "about" rules need both words anywhere in the heading, hence the lookaheads.
+_SECTION_RES = [
+    ("About the Role", re.compile(r"^(?=.*about)(?=.*(?:role|position))", re.S)),
+    ("About Us", re.compile(r"^(?=.*about)(?=.*(?:riskified|us|company|team))", re.S)),
+    ("What You'll Be Doing", re.compile(r"responsibil|what you'll be doing|what you will do|day-to-day|what you’ll do")),
+    ("Qualifications", re.compile(r"requirement|qualification|skills|must have|nice to have")),
+    ("Benefits", re.compile(r"benefit|perks|why you'll love|why you’ll love|compensation")),
+    ("Life at", re.compile(r"life at")),
+]
 
 def parse_greenhouse_description(raw_html: str) -> dict:
     decoded = html.unescape(raw_html or "")
-    soup = BeautifulSoup(decoded, "html.parser")
+    soup = BeautifulSoup(decoded, "lxml", parse_only=SECTION_STRAINER)
 
     sections = {}
     curr = "General"
@@ -77,20 +118,7 @@ def parse_greenhouse_description(raw_html: str) -> dict:
                 sections[curr] = "\n".join(buffer).strip()
                 buffer = []
             ttl = txt.lower()
-            if "about" in ttl and ("role" in ttl or "position" in ttl):
-                curr = "About the Role"
-            elif "about" in ttl and any(k in ttl for k in ["riskified", "us", "company", "team"]):
-                curr = "About Us"
-            elif any(k in ttl for k in ["responsibil", "what you'll be doing", "what you will do", "day-to-day", "what you’ll do"]):
-                curr = "What You'll Be Doing"
-            elif any(k in ttl for k in ["requirement", "qualification", "qualifications", "skills", "must have", "nice to have"]):
-                curr = "Qualifications"
-            elif any(k in ttl for k in ["benefit", "perks", "why you'll love", "why you’ll love", "compensation"]):
-                curr = "Benefits"
-            elif "life at" in ttl:
-                curr = "Life at"
-            else:
-                curr = txt
+            curr = next((name for name, rx in _SECTION_RES if rx.search(ttl)), txt)
         else:
             buffer.append(txt)
 
@@ -120,9 +148,9 @@ def parse_greenhouse_description(raw_html: str) -> dict:
 
 def scrape_riskified_jobs(keyword: str = "Data Scientist"):
     url = "https://boards-api.greenhouse.io/v1/boards/riskified/jobs"
-    resp = requests.get(url, params={"content": "true"}, timeout=TIMEOUT)
+    resp = SESSION.get(url, params={"content": "true"}, timeout=TIMEOUT)
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content) if orjson else resp.json()
 
     jobs = []
     scraped_time = utc_now_iso()
@@ -157,30 +185,23 @@ def scrape_riskified_jobs(keyword: str = "Data Scientist"):
 def upsert_and_mark_stale(path: str, new_rows: list):
     existing_rows = []
     if os.path.exists(path):
-        try:
-            import pandas as pd
-            try:
-                df = pd.read_csv(path, encoding="utf-8-sig")
-            except Exception:
-                df = pd.read_csv(path, encoding="utf-8")
-            existing_rows = df.to_dict(orient="records")
-        except Exception:
-            with open(path, "r", encoding="utf-8-sig", newline="") as f:
-                reader = csv.DictReader(f)
-                existing_rows = list(reader)
+        # utf-8-sig also reads BOM-less UTF-8. Older writes left a literal "nan" in empty cells.
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            existing_rows = [{k: ("" if v == "nan" else v) for k, v in r.items()} for r in csv.DictReader(f)]
 
     existing_by_id = {}
     for r in existing_rows:
-        r = ensure_schema(dict(r))
+        r = ensure_schema(r)
         existing_by_id[str(r.get("id", ""))] = r
 
-    current_ids = set(str(r.get("id", "")) for r in new_rows if r.get("id") is not None)
+    current_ids = frozenset(str(r.get("id", "")) for r in new_rows if r.get("id") is not None)
 
     merged = []
     now = utc_now_iso()
+    stale_count = 0
     for rid, row in existing_by_id.items():
-        row = ensure_schema(dict(row))
         if rid and (rid not in current_ids):
+            stale_count += 1
             row["status"] = "stale"
             row["stale_at"] = now
         merged.append(row)
@@ -189,19 +210,17 @@ def upsert_and_mark_stale(path: str, new_rows: list):
     for row in new_rows:
         rid = str(row.get("id", ""))
         if rid and rid not in existing_by_id:
-            new_row = ensure_schema(dict(row))
+            new_row = ensure_schema(row)
             new_row["status"] = "active"
             new_row["stale_at"] = ""
             merged.append(new_row)
             new_count += 1
 
-    with open(path, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDS)
-        writer.writeheader()
-        for r in merged:
-            writer.writerow({k: r.get(k, "") for k in FIELDS})
+    with open(path, "w", newline="", encoding="utf-8-sig", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        writer.writerows(map(_ROW_VALUES, merged))
 
-    stale_count = sum(1 for rid in existing_by_id if rid not in current_ids)
     print(f"Upsert complete. Wrote {len(merged)} rows to {path} (new={new_count}, stale={stale_count})")
 
 if __name__ == "__main__":
@@ -210,140 +229,5 @@ if __name__ == "__main__":
     upsert_and_mark_stale(out_path, jobs)
     print("Riskified jobs updated at", out_path)
 
-################### UNIFICATION #####################################
-
-import os, re, glob, html, unicodedata
-from datetime import datetime
-import pandas as pd
-
-# --------- Configuration ---------
-INPUT_GLOBS = [
-    "jobs_serper.csv",
-    "riskified_ds_jobs.csv",
-    "similarweb_ds_parsed.csv",
-    "taboola_ds_jobs.csv",
-    "melio_ds_jobs.csv",
-]
-OUTPUT_CSV = "merged_jobs_new.csv"
-ENCODINGS = ["utf-8-sig", "utf-8", "cp1255"]  # Try loading with multiple encodings
-
-# --------- Helpers ---------
-JOB_LINK_RE = re.compile(r"^https?://(?:[a-z]{2,3}\.)?linkedin\.com/jobs/view/[\w-]*\d+(?:/|$)", re.I)
-
-def canonicalize_job_link(link: str) -> str:
-    """Normalize LinkedIn job links to a canonical form."""
-    if not isinstance(link, str) or not link:
-        return ""
-    m = re.search(r"/jobs/view/[\w-]*?(\d+)", link)
-    if not m:
-        return link
-    job_id = m.group(1)
-    return f"https://www.linkedin.com/jobs/view/{job_id}/"
-
-def normalize_text(s: str) -> str:
-    """Clean text: decode HTML entities, normalize Unicode, remove extra spaces."""
-    if s is None: return ""
-    s = html.unescape(str(s))
-    s = unicodedata.normalize("NFKC", s)
-    return re.sub(r"\s+", " ", s).strip()
-
-def load_csv_any(path: str) -> pd.DataFrame:
-    """Try reading CSV with several encodings."""
-    last_err = None
-    for enc in ENCODINGS:
-        try:
-            return pd.read_csv(path, encoding=enc)
-        except Exception as e:
-            last_err = e
-            continue
-    raise last_err
-
-def infer_origin_from_filename(fname: str) -> str:
-    """Guess the source name based on the filename."""
-    base = os.path.basename(fname).lower()
-    if "serper" in base: return "LinkedIn via Serper"
-    if "riskified" in base: return "Riskified Careers"
-    if "similarweb" in base: return "SimilarWeb Careers"
-    if "taboola" in base: return "Taboola Careers"
-    if "melio" in base: return "Melio Careers"
-    return base
-
-# --------- Merge ---------
-def merge_job_csvs(input_globs=INPUT_GLOBS, output_path=OUTPUT_CSV):
-    # Collect all matching files
-    files = []
-    for pattern in input_globs:
-        files.extend(glob.glob(pattern))
-    files = sorted(list(dict.fromkeys(files)))  # unique + keep order
-
-    if not files:
-        print("No matching files found for merge.")
-        return
-
-    frames = []
-    for fp in files:
-        try:
-            df = load_csv_any(fp)
-        except Exception as e:
-            print(f"Could not read {fp}: {e}")
-            continue
-
-        # Keep 'source' if exists; always add 'origin_file'
-        df["origin_file"] = os.path.basename(fp)
-        if "source" not in df.columns or df["source"].fillna("").eq("").all():
-            df["source"] = infer_origin_from_filename(fp)
-
-        # Normalize common text fields
-        for col in ["title","company","location","link","date_posted","source"]:
-            if col in df.columns:
-                df[col] = df[col].map(normalize_text)
-
-        # Canonicalize LinkedIn links
-        if "link" in df.columns:
-            df["link_canonical"] = df["link"].map(canonicalize_job_link)
-        else:
-            df["link_canonical"] = ""
-
-        frames.append(df)
-
-    if not frames:
-        print("No data loaded for merging.")
-        return
-
-    merged = pd.concat(frames, ignore_index=True, sort=False)
-
-    # Deduplicate: first by 'link_canonical', then by (title, company, location)
-    merged["__dedup_key"] = merged["link_canonical"]
-    fallback_mask = merged["__dedup_key"].eq("") | merged["__dedup_key"].isna()
-    merged.loc[fallback_mask, "__dedup_key"] = (
-        merged.get("title", "").astype(str).str.lower().fillna("") + "||" +
-        merged.get("company", "").astype(str).str.lower().fillna("") + "||" +
-        merged.get("location", "").astype(str).str.lower().fillna("")
-    )
-
-    before = len(merged)
-    merged = merged.drop_duplicates(subset=["__dedup_key"], keep="first")
-    after = len(merged)
-
-    # Preferred column order; keep other existing columns afterwards
-    preferred_cols = [
-        "id","title","company","location","date_posted",
-        "is_open","status","stale_at",
-        "source","origin_file","link","link_canonical",
-        "About Us","About the Role","What You'll Be Doing",
-        "Qualifications","Life at","In the News",
-        "raw_description_html","scraped_at"
-    ]
-    other_cols = [c for c in merged.columns if c not in preferred_cols + ["__dedup_key"]]
-    merged = merged[ [c for c in preferred_cols if c in merged.columns] + other_cols ]
-
-    # Save output
-    merged.to_csv(output_path, index=False, encoding="utf-8-sig")
-
-    # Summary stats
-    n_sources = merged["source"].nunique() if "source" in merged.columns else "n/a"
-    print(f"Saved '{output_path}' | Rows: {after} (removed duplicates: {before-after}) | Unique sources: {n_sources}")
-
-if __name__ == "__main__":
-    merge_job_csvs()
-
+    from merged_jobs import merge_job_csvs
+    merge_job_csvs(output_path="merged_jobs_new.csv")
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from linkedin_scraper import crawl_serper, upsert_and_mark_stale, CSV_PATH as LINKEDIN_OUT
 from taboola_scraper import scrape_taboola_jobs, upsert_and_mark_stale as upsert_taboola
 from similarweb_scraper import scrape_similarweb_jobs, upsert_and_mark_stale as upsert_similarweb
@@ -5,26 +6,26 @@ from melio_scraper import scrape_melio_jobs, upsert_and_mark_stale as upsert_mel
 from riskified_scraper import scrape_riskified_jobs, upsert_and_mark_stale as upsert_riskified
 from merged_jobs import merge_job_csvs
 
-def main():
-    print("=== LinkedIn via Serper ===")
-    linkedin_rows = crawl_serper()
-    upsert_and_mark_stale(LINKEDIN_OUT, linkedin_rows)
-
-    print("=== Taboola ===")
-    taboola_rows = scrape_taboola_jobs("Data Scientist")
-    upsert_taboola("taboola_ds_jobs.csv", taboola_rows)
-
-    print("=== Similarweb ===")
-    sim_rows = scrape_similarweb_jobs("Data Scientist")
-    upsert_similarweb("similarweb_ds_jobs.csv", sim_rows)
+# (label, scrape call, upsert, output csv) in upsert order
+SCRAPERS = [
+    ("LinkedIn via Serper", lambda: crawl_serper(), upsert_and_mark_stale, LINKEDIN_OUT),
+    ("Taboola", lambda: scrape_taboola_jobs("Data Scientist"), upsert_taboola, "taboola_ds_jobs.csv"),
+    ("Similarweb", lambda: scrape_similarweb_jobs("Data Scientist"), upsert_similarweb, "similarweb_ds_jobs.csv"),
+    ("Melio", lambda: scrape_melio_jobs("Data Scientist"), upsert_melio, "melio_ds_jobs.csv"),
+    ("Riskified", lambda: scrape_riskified_jobs("Data Scientist"), upsert_riskified, "riskified_ds_jobs.csv"),
+]
 
-    print("=== Melio ===")
-    melio_rows = scrape_melio_jobs("Data Scientist")
-    upsert_melio("melio_ds_jobs.csv", melio_rows)
-
-    print("=== Riskified ===")
-    risk_rows = scrape_riskified_jobs("Data Scientist")
-    upsert_riskified("riskified_ds_jobs.csv", risk_rows)
+def main():
+    print("=== Scraping (concurrently) ===")
+    # Every scraper gets its own thread; they only wait on HTTP, so wall time ~ the slowest one
+    with ThreadPoolExecutor(max_workers=len(SCRAPERS)) as pool:
+        futures = [pool.submit(scrape) for _, scrape, _, _ in SCRAPERS]
+
+        # Upserts stay sequential and in the old order; result() re-raises the first failed scraper
+        for (label, _, upsert, out_path), future in zip(SCRAPERS, futures):
+            rows = future.result()
+            print(f"=== {label} ===")
+            upsert(out_path, rows)
 
     print("=== Merge CSVs ===")
     merge_job_csvs(
@@ -1,18 +1,39 @@
 import os
 import requests
 import csv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import html
 import re
-from bs4 import BeautifulSoup
+import ahocorasick
 from datetime import datetime, timezone
+try:
+    import orjson
+except ImportError:
+    orjson = None
+import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv  # multithreaded CSV reader for the existing output file
+except ImportError:
+    pacsv = None
+
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+))
 
 def utc_now_iso():
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
+_ISO_UTC_RE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\+00:00\Z")
+
 def pick_date(job: dict) -> str:
     raw = (job.get("updated_at") or job.get("created_at") or "").strip()
     if not raw:
         return ""
+    if _ISO_UTC_RE.match(raw):
+        return raw
     try:
         if raw.endswith("Z"):
             dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
@@ -29,10 +50,13 @@ FIELDS = [
     "status", "stale_at",
 ]
 
+_DEFAULTS = dict.fromkeys(FIELDS, "")
+
 def ensure_schema(row: dict) -> dict:
-    for c in FIELDS:
-        row.setdefault(c, "")
-    return row
+    """New dict: every FIELDS column (default "") overlaid with row."""
+    out = _DEFAULTS.copy()
+    out.update(row)
+    return out
 
 IL_STRICT_TOKENS = {
     "israel", "ישראל",
@@ -50,56 +74,65 @@ IL_CITY_TOKENS = {
     "karmiel", "כרמיאל", "hod hasharon", "הוד השרון", "bat yam", "בת ים",
     "kiryat", "קריית"
 }
+_IL_AC = ahocorasick.Automaton()
+for _tok in IL_STRICT_TOKENS | IL_CITY_TOKENS:
+    _IL_AC.add_word(_tok, _tok)
+_IL_AC.make_automaton()
+
 def is_israel_location(loc: str) -> bool:
     if not loc:
         return False
-    t = loc.lower()
-    if any(tok in t for tok in IL_STRICT_TOKENS):
-        return True
-    return any(tok in t for tok in IL_CITY_TOKENS)
+    return next(_IL_AC.iter(loc.casefold()), None) is not None
+
+SECTION_MAP = {
+    "About Us": ["about similarweb", "about us", "who we are", "our company", "similarweb is"],
+    "About the Role": ["we are looking for", "we’re looking for", "about the role", "role overview", "why is this role"],
+    "What You'll Be Doing": ["key responsibilities", "what you'll be doing", "your role", "day-to-day", "so, what will you be doing"],
+    "Qualifications": ["requirements", "qualifications", "ideal candidate", "must have", "needed", "this is the perfect job"],
+    "Life at": ["why similarweb", "why you’ll love", "why you'll love", "benefits", "perks", "life at similarweb", "you’ll find a home", "diversity isn’t just"],
+    "In the News": ["in the news"]
+}
+# All keywords in one pattern; group g<i> -> _SECTION_KEYWORDS[i]. The lookahead makes every
+# match zero-width, so overlapping keywords are still found at their own positions.
+_SECTION_KEYWORDS = [(section, kw) for section, kws in SECTION_MAP.items() for kw in kws]
+_SECTION_RE = re.compile(
+    "(?=" + "|".join(f"(?P<g{i}>{re.escape(kw)})" for i, (_, kw) in enumerate(_SECTION_KEYWORDS)) + ")",
+    re.IGNORECASE,
+)
+
+# script/style blocks, comments, then any other tag
+_TAG_RE = re.compile(r"<(script|style)\b.*?</\1\s*>|<!--.*?-->|<[A-Za-z/!?][^>]*>", re.S | re.I)
+
+def html_to_text(decoded: str) -> str:
+    """Regex stand-in for BeautifulSoup(...).get_text(separator="\\n", strip=True) on Greenhouse
+    content; only '<' + letter, '/', '!' or '?' opens a tag, so a bare '<' stays text."""
+    parts = (html.unescape(p).strip() for p in _TAG_RE.sub("\x00", decoded).split("\x00"))
+    return "\n".join(p for p in parts if p)
 
 def parse_greenhouse_to_riskified_format2(raw_html):
-    decoded = html.unescape(raw_html or "")
-    soup = BeautifulSoup(decoded, "html.parser")
-    text = soup.get_text(separator="\n", strip=True)
-
-    section_map = {
-        "About Us": ["about similarweb", "about us", "who we are", "our company", "similarweb is"],
-        "About the Role": ["we are looking for", "we’re looking for", "about the role", "role overview", "why is this role"],
-        "What You'll Be Doing": ["key responsibilities", "what you'll be doing", "your role", "day-to-day", "so, what will you be doing"],
-        "Qualifications": ["requirements", "qualifications", "ideal candidate", "must have", "needed", "this is the perfect job"],
-        "Life at": ["why similarweb", "why you’ll love", "why you'll love", "benefits", "perks", "life at similarweb", "you’ll find a home", "diversity isn’t just"],
-        "In the News": ["in the news"]
-    }
-
-    sections = {section: "" for section in section_map}
-    matches = []
-    for section, keywords in section_map.items():
-        for kw in keywords:
-            m = re.search(re.escape(kw), text, re.IGNORECASE)
-            if m:
-                matches.append((m.start(), section))
-
-    if not matches:
-        return sections
-
-    matches.sort()
-    matches.append((len(text), None))
-    for i in range(len(matches) - 1):
-        start_idx = matches[i][0]
-        end_idx = matches[i + 1][0]
-        section_name = matches[i][1]
-        content = text[start_idx:end_idx].strip()
-        if section_name:
-            sections[section_name] += content
-    return {k: v.strip() for k, v in sections.items()}
+    if not raw_html:
+        return {section: "" for section in SECTION_MAP}
+    decoded = html.unescape(raw_html) if "&" in raw_html else raw_html
+    text = html_to_text(decoded)
+
+    # one scan; like the old per-keyword re.search, only each keyword's first hit counts.
+    # finditer walks the text in order, so first_hit is already sorted by position.
+    first_hit = {}
+    for m in _SECTION_RE.finditer(text):
+        first_hit.setdefault(int(m.lastgroup[1:]), m.start())
+    matches = [(pos, _SECTION_KEYWORDS[i][0]) for i, pos in first_hit.items()]
+
+    parts = {section: [] for section in SECTION_MAP}
+    for (start_idx, section_name), (end_idx, _) in zip(matches, matches[1:] + [(len(text), None)]):
+        parts[section_name].append(text[start_idx:end_idx].strip())
+    return {k: "".join(v).strip() for k, v in parts.items()}
 
 def scrape_similarweb_jobs(keyword="Data Scientist"):
     url = "https://boards-api.greenhouse.io/v1/boards/similarweb/jobs"
     params = {"content": "true"}
-    resp = requests.get(url, params=params, timeout=30)
+    resp = SESSION.get(url, params=params, timeout=30)
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content) if orjson else resp.json()
 
     jobs = []
     scraped_time = utc_now_iso()
@@ -108,75 +141,70 @@ def scrape_similarweb_jobs(keyword="Data Scientist"):
         title = (job.get("title") or "")
         location_name = (job.get("location") or {}).get("name", "")
 
+        # cheapest check first; the description is only parsed for jobs that pass both
         if keyword.lower() not in title.lower():
             continue
         if not is_israel_location(location_name):
             continue
 
         parsed_desc = parse_greenhouse_to_riskified_format2(job.get("content", ""))
-        row = {
-            "id": job.get("id"),
-            "title": title,
-            "location": location_name,
-            "date_posted": pick_date(job),
-            "link": job.get("absolute_url"),
-            "source": "SimilarWeb Careers",
-            "scraped_at": scraped_time,
-            **parsed_desc
-        }
-        jobs.append(ensure_schema(row))
+        # _DEFAULTS already carries every FIELDS key, so no ensure_schema pass is needed
+        row = _DEFAULTS.copy()
+        row["id"] = job.get("id")
+        row["title"] = title
+        row["location"] = location_name
+        row["date_posted"] = pick_date(job)
+        row["link"] = job.get("absolute_url")
+        row["source"] = "SimilarWeb Careers"
+        row["scraped_at"] = scraped_time
+        row.update(parsed_desc)
+        jobs.append(row)
 
     print(f"Found {len(jobs)} 'Data Scientist' positions at Similarweb (Israel only)")
     return jobs
 
+def read_existing_csv(path: str) -> pd.DataFrame:
+    if pacsv is None:
+        return pd.read_csv(path, encoding="utf-8-sig", dtype=str, keep_default_na=False, na_values=["nan"])
+    # Arrow skips the UTF-8 BOM itself; every column is pinned to string so ids never turn into ints
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), [])
+    table = pacsv.read_csv(
+        path,
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in header},
+            null_values=["nan"], strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas()
+
 def upsert_and_mark_stale(path: str, new_rows: list):
-    existing_rows = []
-    if os.path.exists(path):
-        try:
-            import pandas as pd
-            try:
-                df = pd.read_csv(path, encoding="utf-8-sig")
-            except Exception:
-                df = pd.read_csv(path, encoding="utf-8")
-            existing_rows = df.to_dict(orient="records")
-        except Exception:
-            with open(path, "r", encoding="utf-8-sig", newline="") as f:
-                reader = csv.DictReader(f)
-                existing_rows = list(reader)
-
-    existing_by_id = {}
-    for r in existing_rows:
-        r = ensure_schema(dict(r))
-        existing_by_id[str(r.get("id", ""))] = r
+    # Existing rows stay a string DataFrame end to end; empty / "nan" cells read back as ""
+    df = pd.DataFrame(columns=FIELDS, dtype=str)
+    if os.path.exists(path) and os.path.getsize(path):
+        df = read_existing_csv(path).fillna("")
+        # Repeated ids: last row's values at the first row's position (what the old dict upsert did)
+        df = df.reindex(columns=FIELDS, fill_value="").groupby("id", sort=False, as_index=False).last()
 
     current_ids = set(str(r.get("id", "")) for r in new_rows if r.get("id") is not None)
 
-    merged = []
     now = utc_now_iso()
-    for rid, row in existing_by_id.items():
-        row = ensure_schema(dict(row))
-        if rid and (rid not in current_ids):
-            row["status"] = "stale"
-            row["stale_at"] = now
-        merged.append(row)
-
-    new_count = 0
-    for row in new_rows:
-        rid = str(row.get("id", ""))
-        if rid and rid not in existing_by_id:
-            new_row = ensure_schema(dict(row))
-            new_row["status"] = "active"
-            new_row["stale_at"] = ""
-            merged.append(new_row)
-            new_count += 1
-
-    with open(path, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDS)
-        writer.writeheader()
-        for r in merged:
-            writer.writerow({k: r.get(k, "") for k in FIELDS})
-
-    stale_count = sum(1 for rid in existing_by_id if rid not in current_ids)
+    stale = df["id"].ne("") & ~df["id"].isin(current_ids)
+    df.loc[stale, "status"] = "stale"
+    df.loc[stale, "stale_at"] = now
+
+    existing_ids = set(df["id"])
+    new_only = [r for r in new_rows if str(r.get("id", "")) and str(r.get("id", "")) not in existing_ids]
+    new_df = pd.DataFrame(new_only, columns=FIELDS, dtype=object).fillna("")
+    new_df["status"] = "active"
+    new_df["stale_at"] = ""
+    new_count = len(new_df)
+
+    merged = pd.concat([df, new_df], ignore_index=True)
+    merged.to_csv(path, index=False, columns=FIELDS, encoding="utf-8-sig", lineterminator="\r\n")
+
+    stale_count = int(stale.sum())
     print(f"Upsert complete. Wrote {len(merged)} rows to {path} (new={new_count}, stale={stale_count})")
 
 if __name__ == "__main__":
@@ -1,10 +1,23 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import csv
 import html
 import re
+import ahocorasick
 from bs4 import BeautifulSoup
 from datetime import datetime, timezone
+from operator import itemgetter
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+))
 
 # -----------------------------
 # Shared helpers (time, schema, IL filter)
@@ -12,10 +25,14 @@ from datetime import datetime, timezone
 def utc_now_iso():
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
+_ISO_UTC_RE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\+00:00\Z")
+
 def pick_date(job: dict) -> str:
     raw = (job.get("updated_at") or job.get("created_at") or "").strip()
     if not raw:
         return ""
+    if _ISO_UTC_RE.match(raw):
+        return raw
     try:
         if raw.endswith("Z"):
             dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
@@ -32,10 +49,14 @@ FIELDS = [
     "status", "stale_at",
 ]
 
+_DEFAULTS = dict.fromkeys(FIELDS, "")
+_ROW_VALUES = itemgetter(*FIELDS)
+
 def ensure_schema(row: dict) -> dict:
-    for c in FIELDS:
-        row.setdefault(c, "")
-    return row
+    """New dict: every FIELDS column (default "") overlaid with row."""
+    out = _DEFAULTS.copy()
+    out.update(row)
+    return out
 
 # Israel-only filter (strict: requires explicit Israel in the location string)
 IL_STRICT_TOKENS = {
@@ -55,14 +76,16 @@ IL_CITY_TOKENS = {
     "karmiel", "כרמיאל", "hod hasharon", "הוד השרון", "bat yam", "בת ים",
     "kiryat", "קריית"
 }
+_IL_AC = ahocorasick.Automaton()
+for _tok in IL_STRICT_TOKENS | IL_CITY_TOKENS:
+    _IL_AC.add_word(_tok, _tok)
+_IL_AC.make_automaton()
+
 def is_israel_location(loc: str) -> bool:
     """Return True only if the location explicitly refers to Israel or an Israeli city."""
     if not loc:
         return False
-    t = loc.lower()
-    if any(tok in t for tok in IL_STRICT_TOKENS):
-        return True
-    return any(tok in t for tok in IL_CITY_TOKENS)
+    return next(_IL_AC.iter(loc.casefold()), None) is not None
 
 # -----------------------------
 # Section parsing
@@ -109,9 +132,9 @@ def parse_taboola_description(raw_html):
 def scrape_taboola_jobs(keyword="Data Scientist"):
     url = "https://boards-api.greenhouse.io/v1/boards/taboola/jobs"
     params = {"content": "true"}
-    resp = requests.get(url, params=params, timeout=30)
+    resp = SESSION.get(url, params=params, timeout=30)
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content) if orjson else resp.json()
 
     jobs = []
     scraped_time = utc_now_iso()
@@ -127,17 +150,16 @@ def scrape_taboola_jobs(keyword="Data Scientist"):
             continue
 
         parsed_desc = parse_taboola_description(job.get("content", ""))
-        row = {
-            "id": job.get("id"),
-            "title": title,
-            "location": location_name,
-            "date_posted": pick_date(job),
-            "link": job.get("absolute_url"),
-            "source": "Taboola Careers",
-            "scraped_at": scraped_time,
-            **parsed_desc
-        }
-        jobs.append(ensure_schema(row))
+        row = _DEFAULTS.copy()
+        row["id"] = job.get("id")
+        row["title"] = title
+        row["location"] = location_name
+        row["date_posted"] = pick_date(job)
+        row["link"] = job.get("absolute_url")
+        row["source"] = "Taboola Careers"
+        row["scraped_at"] = scraped_time
+        row.update(parsed_desc)
+        jobs.append(row)
 
     print(f"Found {len(jobs)} 'Data Scientist' positions at Taboola (Israel only)")
     return jobs
@@ -148,51 +170,45 @@ def scrape_taboola_jobs(keyword="Data Scientist"):
 def upsert_and_mark_stale(path: str, new_rows: list):
     existing_rows = []
     if os.path.exists(path):
-        try:
-            import pandas as pd
-            try:
-                df = pd.read_csv(path, encoding="utf-8-sig")
-            except Exception:
-                df = pd.read_csv(path, encoding="utf-8")
-            existing_rows = df.to_dict(orient="records")
-        except Exception:
-            with open(path, "r", encoding="utf-8-sig", newline="") as f:
-                reader = csv.DictReader(f)
-                existing_rows = list(reader)
+        # Peek for the BOM once; cells stay strings (a blank id must not turn ids into floats),
+        # and the literal "nan" older pandas writes left in empty cells reads back as ""
+        with open(path, "rb") as f:
+            enc = "utf-8-sig" if f.read(3) == b"\xef\xbb\xbf" else "utf-8"
+        with open(path, "r", encoding=enc, newline="") as f:
+            existing_rows = [{k: ("" if v == "nan" else v) for k, v in r.items()} for r in csv.DictReader(f)]
 
     existing_by_id = {}
     for r in existing_rows:
-        r = ensure_schema(dict(r))
+        r = ensure_schema(r)
         existing_by_id[str(r.get("id", ""))] = r
 
     current_ids = set(str(r.get("id", "")) for r in new_rows if r.get("id") is not None)
 
-    merged = []
+    # rows are updated in place, so merged keeps the file's original order
+    stale_ids = existing_by_id.keys() - current_ids - {""}
     now = utc_now_iso()
-    for rid, row in existing_by_id.items():
-        if rid and (rid not in current_ids):
-            row = dict(row)
-            row["status"] = "stale"
-            row["stale_at"] = now
-        merged.append(row)
+    for rid in stale_ids:
+        existing_by_id[rid]["status"] = "stale"
+        existing_by_id[rid]["stale_at"] = now
+    merged = list(existing_by_id.values())
 
     new_count = 0
     for row in new_rows:
         rid = str(row.get("id", ""))
         if rid and rid not in existing_by_id:
-            new_row = ensure_schema(dict(row))
+            new_row = ensure_schema(row)
             new_row["status"] = "active"
             new_row["stale_at"] = ""
             merged.append(new_row)
             new_count += 1
 
-    with open(path, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDS)
-        writer.writeheader()
-        for r in merged:
-            writer.writerow({k: r.get(k, "") for k in FIELDS})
+    # plain lists in FIELDS order; extra columns from the old file are dropped
+    with open(path, "w", newline="", encoding="utf-8-sig", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        writer.writerows(map(_ROW_VALUES, merged))
 
-    stale_count = sum(1 for rid in existing_by_id if rid not in current_ids)
+    stale_count = len(stale_ids)
     print(f"Upsert complete. Wrote {len(merged)} rows to {path} (new={new_count}, stale={stale_count})")
 
 if __name__ == "__main__":